@@ -1,11 +1,33 @@
-from collections import MutableMapping, Sequence
-from _util import down_heap, up_heap
+import heapq
+import itertools
+import operator
+from collections.abc import MutableMapping, Sequence
+try:
+    from ._cutil import down_heap, heapify, up_heap
+except ImportError:
+    from ._util import down_heap, heapify, up_heap
+from ._util import D
+
+
+def __getattr__(name):
+    """Import the numeric heaps on first use, so that numpy (and numba) are
+    only loaded when they are needed.
+    """
+    if name in ('NumericHeap', 'NumericKeyHeap'):
+        try:
+            from . import _numeric
+        except ImportError as err:
+            raise AttributeError(
+                "{} requires numpy (and numba): {}".format(name, err)) from err
+        return getattr(_numeric, name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
 
 
 class KeyHeap(MutableMapping):
     """A heap data structure supporting key look-up and update.
 
-    This is a binary heap that keep tracks of the keys of the input values.
+    This is a 4-ary heap that keep tracks of the keys of the input values.
     The heap is organized with the values, and one can use the key to quickly
     access and update the values associated with the keys. This is
     particularly useful for implementing Dijkstra's algorithm or Minimum
@@ -26,8 +48,13 @@ class KeyHeap(MutableMapping):
     >>> heap["b"] = 2  # Update the key value (cause heap reorganization)
     >>> heap.peek()  # Get the current top element
     ('b', 2)
+    >>> heap.push("b", 5)  # Only set the value if it is upper
+    False
     """
 
+    __slots__ = ('_vals', '_ids', '_id2pos', '_key2id', '_id2key',
+                 '_free_ids', '_is_min_heap', '_upper_eq')
+
     def __init__(self, init_data=None, max_heap=False):
         """Create a heap. Default it returns a min-heap. Use
         'max_heap' keyword to get max-heap.
@@ -37,40 +64,51 @@ class KeyHeap(MutableMapping):
                         a dict or an iterable that returns (key, value).
             max_heap - True if being max-heap. Default to False.
         """
-        self._key2idx = {}
-        self._val_keys = []
+        # Each key gets a dense integer id, so the sifts only index lists
+        # with ints and never hash the keys. Ids of removed keys are reused.
+        self._vals = []  # heap of values
+        self._ids = []  # id of the key of each value
+        self._id2pos = []  # id -> index in the heap
+        self._key2id = {}
+        self._id2key = []
+        self._free_ids = []
         self._is_min_heap = not max_heap
+        # Return True if i is upper than or equal to j.
+        # For min-heap, upper=less; for max-heap upper=greater.
+        self._upper_eq = operator.ge if max_heap else operator.le
         if init_data is not None:
             self.update(init_data)
 
     def __contains__(self, key):
         """Check if container has key."""
-        return key in self._key2idx
+        return key in self._key2id
 
     def __iter__(self):
         """Return a iterable of the keys."""
-        return iter(self._key2idx)
+        return iter(self._key2id)
 
     def __len__(self):
         """Return length of the container."""
-        return len(self._val_keys)
+        return len(self._vals)
 
     def __repr__(self):
         """Representation of the container."""
-        repr_list = ['<KeyHeap ']
+        repr_list = ['<KeyHeap {']
         if self:
-            for val, key in self._val_keys:
-                repr_list.append('{}: {}, '.format(repr(key), repr(val)))
+            id2key = self._id2key
+            for id_, val in zip(self._ids, self._vals):
+                repr_list.append('{}: {}, '.format(repr(id2key[id_]),
+                                                   repr(val)))
             repr_list[-1] = repr_list[-1][:-2]
         repr_list.append('}>')
         return ''.join(repr_list)
 
     def __getitem__(self, key):
         """Return value from key."""
-        if key not in self:
+        id_ = self._key2id.get(key, -1)
+        if id_ < 0:
             raise KeyError("key not in container")
-        idx = self._key2idx[key]
-        return self._idx2val(idx)
+        return self._vals[self._id2pos[id_]]
 
     def __setitem__(self, key, value):
         """Set value of the key. If key does not in container, add the
@@ -79,39 +117,58 @@ class KeyHeap(MutableMapping):
         The update of key value uses the heap decrease/increase
         key algorithm.
         """
-        if key not in self:
-            self._val_keys.append((value, key))
-            idx = len(self) - 1
-            self._key2idx[key] = idx
-            up_heap(self, idx)
+        vals = self._vals
+        ids = self._ids
+        id2pos = self._id2pos
+        id_ = self._key2id.get(key, -1)
+        if id_ < 0:
+            idx = len(vals)
+            id_ = self._new_id(key)
+            vals.append(value)
+            ids.append(id_)
+            id2pos[id_] = idx
+            up_heap(vals, ids, id2pos, idx, self._is_min_heap)
         else:
-            idx = self._key2idx[key]
-            val_old = self._idx2val(idx)
+            idx = id2pos[id_]
+            val_old = vals[idx]
             if val_old == value:
                 return
-            self._val_keys[idx] = (value, key)
+            vals[idx] = value
             if self._upper_eq(value, val_old):
-                up_heap(self, idx)
+                up_heap(vals, ids, id2pos, idx, self._is_min_heap)
             else:
-                down_heap(self, idx)
+                down_heap(vals, ids, id2pos, idx, self._is_min_heap)
 
     def __delitem__(self, key):
         """Remove the key and its value from the container."""
-        if key not in self:
+        id_ = self._key2id.pop(key, -1)
+        if id_ < 0:
             raise KeyError("key not in container")
-
-        last_idx = len(self) - 1
-        idx_curr = self._key2idx[key]
-        self._swap(idx_curr, last_idx)
-        del self._key2idx[key]
-        self._val_keys.pop()
-        if self:
-            down_heap(self, idx_curr)
+        vals = self._vals
+        ids = self._ids
+        id2pos = self._id2pos
+        idx_curr = id2pos[id_]
+        self._id2key[id_] = None
+        self._free_ids.append(id_)
+
+        val_last = vals.pop()
+        id_last = ids.pop()
+        if idx_curr < len(vals):
+            vals[idx_curr] = val_last
+            ids[idx_curr] = id_last
+            id2pos[id_last] = idx_curr
+            # The moved-in last element may belong above or below idx_curr
+            down_heap(vals, ids, id2pos, idx_curr, self._is_min_heap)
+            up_heap(vals, ids, id2pos, idx_curr, self._is_min_heap)
 
     def clear(self):
         """Empty the container."""
-        self._key2idx.clear()
-        self._val_keys = []
+        self._vals = []
+        self._ids = []
+        self._id2pos = []
+        self._key2id = {}
+        self._id2key = []
+        self._free_ids = []
 
     def update(self, *args, **kwds):
         """D.update([E, ]**F) -> None.  Update D from dict/iterable E and F.
@@ -119,55 +176,89 @@ class KeyHeap(MutableMapping):
         If E present and lacks .keys() method, does: for (k, v) in E: D[k] = v
         In either case, this is followed by: for k in F: D[k] = F[k]
 
-        Use the heapify algorithm to rebuild the heap, to achieve O(n)
-        performance for heap creation/merge.
+        The key-values are merged into a dict together with the current
+        content, then the heap is rebuilt from it with the heapify algorithm,
+        to achieve O(n) performance for heap creation/merge.
         """
-        def add(key, val):
-            if key in self:
-                idx = self._key2idx[key]
-                self._val_keys[idx] = (val, key)
-            else:
-                self._key2idx[key] = len(self)
-                self._val_keys.append((val, key))
-
-        def add_from_mapping(mapping):
-            for key in mapping:
-                val = mapping[key]
-                add(key, val)
-
-        def add_from_iterable(iterable):
-            for key, val in iterable:
-                add(key, val)
-
+        id2key = self._id2key
+        key2val = dict(zip([id2key[id_] for id_ in self._ids], self._vals))
         for i, container in enumerate(args):
             try:
-                if hasattr(container, "keys"):
-                    add_from_mapping(container)
-                else:
-                    add_from_iterable(container)
+                key2val.update(container)
             except Exception:
                 raise TypeError(
                     "cannot convert update sequence element "
                     "#{} to a sequence".format(i))
+        key2val.update(kwds)
+        self._load(key2val)
+
+    @classmethod
+    def from_iterable(cls, iterable, max_heap=False):
+        """Create a heap from a dict or an iterable of (key, value).
 
-        add_from_mapping(kwds)
+        All the key-values are loaded at once and the heap is built with a
+        single O(n) heapify, which is faster than inserting them one by one.
+        For a repeated key the last value is kept.
 
-        len_half = len(self) // 2
-        for idx in reversed(xrange(len_half)):
-            down_heap(self, idx)
+        Args:
+            iterable - A dict or an iterable that returns (key, value).
+            max_heap - True if being max-heap. Default to False.
+        """
+        heap = cls(max_heap=max_heap)
+        heap._load(dict(iterable))
+        return heap
+
+    def push(self, key, value):
+        """Set value of the key, unless the key is already in the heap with
+        a value upper than or equal to `value`. Return True if the value is
+        set.
+
+        This is the relaxation step of Dijkstra's algorithm: a worse
+        distance is rejected with a single comparison, without touching the
+        heap.
+        """
+        id_ = self._key2id.get(key, -1)
+        if id_ < 0:
+            self[key] = value
+            return True
+        vals = self._vals
+        idx = self._id2pos[id_]
+        if self._upper_eq(vals[idx], value):
+            return False
+        vals[idx] = value
+        up_heap(vals, self._ids, self._id2pos, idx, self._is_min_heap)
+        return True
 
     def pop(self, key=None):
         """Remove and return the given key and value.
         If key i not given, pop top element of the heap
         (min elementin min-heap; max element in max-heap).
         """
-        if not self:
-            raise KeyError("peek/pop from an empty container")
         if key is not None:
-            return super(KeyHeap, self).pop(key)
-        key, val = self.peek()
-        del self[key]
-        return key, val
+            return super().pop(key)
+        return self.popitem()
+
+    def popitem(self):
+        """Remove and return the top element of the heap."""
+        vals = self._vals
+        if not vals:
+            raise KeyError("peek/pop from an empty container")
+        ids = self._ids
+        id2pos = self._id2pos
+        val_top = vals[0]
+        id_top = ids[0]
+        key_top = self._id2key[id_top]
+        del self._key2id[key_top]
+        self._id2key[id_top] = None
+        self._free_ids.append(id_top)
+        val_last = vals.pop()
+        id_last = ids.pop()
+        if vals:
+            vals[0] = val_last
+            ids[0] = id_last
+            id2pos[id_last] = 0
+            down_heap(vals, ids, id2pos, 0, self._is_min_heap)
+        return key_top, val_top
 
     def peek(self):
         """Return the top element of the heap
@@ -175,43 +266,77 @@ class KeyHeap(MutableMapping):
         """
         if not self:
             raise KeyError("peek/pop from an empty container")
-        val, key = self._val_keys[0]
-        return key, val
+        return self._id2key[self._ids[0]], self._vals[0]
+
+    def drain(self):
+        """Remove all the elements and return them as a list of (key, value)
+        in pop order.
+
+        The values are sorted at once (in C), which is much faster than
+        popping them one by one. Values that can not be sorted (e.g. only
+        define <=) are popped one by one instead.
+        """
+        vals = self._vals
+        id2key = self._id2key
+        ids = self._ids
+        try:
+            order = sorted(range(len(vals)), key=vals.__getitem__,
+                           reverse=not self._is_min_heap)
+        except TypeError:
+            return [self.popitem() for _ in range(len(vals))]
+        items = [(id2key[ids[idx]], vals[idx]) for idx in order]
+        self.clear()
+        return items
 
     def copy(self):
         """Return a shallow copy of the container."""
-        new = KeyHeap()
-        new._key2idx = self._key2idx.copy()
-        new._val_keys = self._val_keys[:]
+        new = type(self).__new__(type(self))
+        new._vals = self._vals[:]
+        new._ids = self._ids[:]
+        new._id2pos = self._id2pos[:]
+        new._key2id = self._key2id.copy()
+        new._id2key = self._id2key[:]
+        new._free_ids = self._free_ids[:]
         new._is_min_heap = self._is_min_heap
+        new._upper_eq = self._upper_eq
         return new
 
-    def _idx2val(self, idx):
-        """Return the value stored at position `idx` in heap."""
-        return self._val_keys[idx][0]
-
-    def _upper_eq(self, i, j):
-        """Return True if i is upper than or equal to j.
-        For min-heap, upper=less; for max-heap upper=greater.
+    def _new_id(self, key):
+        """Assign an id to a new key, reusing the id of a removed key if
+        possible."""
+        if self._free_ids:
+            id_ = self._free_ids.pop()
+            self._id2key[id_] = key
+        else:
+            id_ = len(self._id2key)
+            self._id2key.append(key)
+            self._id2pos.append(-1)
+        self._key2id[key] = id_
+        return id_
+
+    def _load(self, key2val):
+        """Replace the content with the key-values of a dict and heapify.
+
+        The lists and _key2id are built from the dict with single C-level
+        calls, so _key2id is allocated once at its final size instead of
+        growing (and rehashing) key by key.
         """
-        if self._is_min_heap:
-            return i <= j
-        return i >= j
-
-    def _swap(self, i1, i2):
-        """Swap the values in two indices."""
-        val1, key1 = self._val_keys[i1]
-        val2, key2 = self._val_keys[i2]
-        self._key2idx[key1], self._key2idx[key2] = i2, i1
-        self._val_keys[i1] = val2, key2
-        self._val_keys[i2] = val1, key1
+        n = len(key2val)
+        self._vals = list(key2val.values())
+        self._ids = list(range(n))
+        self._id2pos = list(range(n))
+        self._id2key = list(key2val)
+        self._key2id = dict(zip(self._id2key, range(n)))
+        self._free_ids = []
+        heapify(self._vals, self._ids, self._id2pos, self._is_min_heap)
 
 
 class Heap(Sequence):
     """A basic heap data structure.
 
-    This is a binary heap. Heap is a subclass of collections.Sequence, having
-    an interface similar as Python built-in list.
+    This is a 4-ary heap, i.e. each node has four children, which halves the
+    depth of a binary heap. Heap is a subclass of collections.Sequence,
+    having an interface similar as Python built-in list.
 
     Usage:
     >>> heap = Heap(max_heap=True)  # create empty max-heap
@@ -226,6 +351,8 @@ class Heap(Sequence):
     7
     """
 
+    __slots__ = ('_vals', '_is_min_heap', '_upper_eq')
+
     def __init__(self, init_data=None, max_heap=False):
         """Create a heap. Default it returns a min-heap. Use
         'max_heap' keyword to get max-heap.
@@ -236,11 +363,19 @@ class Heap(Sequence):
         """
         self._vals = []
         self._is_min_heap = not max_heap
+        # Return True if i is upper than or equal to j.
+        # For min-heap, upper=less; for max-heap upper=greater.
+        self._upper_eq = operator.ge if max_heap else operator.le
         if init_data is not None:
             self.extend(init_data)
 
     def __contains__(self, value):
-        """Check if container has value."""
+        """Check if container has value.
+
+        This is a linear scan, O(n). To test membership repeatedly (e.g. the
+        settled vertices of Dijkstra's algorithm), keep a separate set, or
+        use KeyHeap whose membership test is a dict lookup.
+        """
         return value in self._vals
 
     def __iter__(self):
@@ -267,23 +402,40 @@ class Heap(Sequence):
 
     def copy(self):
         """Return a shallow copy."""
-        new = Heap()
+        new = type(self).__new__(type(self))
         new._vals = self._vals[:]
         new._is_min_heap = self._is_min_heap
+        new._upper_eq = self._upper_eq
         return new
 
+    @classmethod
+    def from_iterable(cls, iterable, max_heap=False):
+        """Create a heap from an iterable of values, built with a single
+        heapify: O(n) with the compiled _cutil, a sort in the pure python
+        build.
+
+        Args:
+            iterable - Input iterable to populate the heap.
+            max_heap - True if being max-heap. Default to False.
+        """
+        heap = cls(max_heap=max_heap)
+        heap._vals = list(iterable)
+        heapify(heap._vals, None, None, heap._is_min_heap)
+        return heap
+
     def pop(self):
         """Remove and return the top element of the heap
         (min element in min-heap; max element in max-heap).
         """
-        if not self:
+        vals = self._vals
+        if not vals:
             raise IndexError("peek/pop from an empty container")
-        top_val = self.peek()
-        last_idx = len(self) - 1
-        self._swap(0, last_idx)
-        self._vals.pop()
-        if self:
-            down_heap(self, 0)
+        val_last = vals.pop()
+        if not vals:
+            return val_last
+        top_val = vals[0]
+        vals[0] = val_last
+        down_heap(vals, None, None, 0, self._is_min_heap)
         return top_val
 
     def peek(self):
@@ -294,19 +446,32 @@ class Heap(Sequence):
             raise IndexError("peek/pop from an empty container")
         return self[0]
 
+    def drain(self):
+        """Remove all the elements and return them as a list in pop order.
+
+        The values are sorted at once (in C), which is much faster than
+        popping them one by one. Values that can not be sorted (e.g. only
+        define <=) are popped one by one instead.
+        """
+        try:
+            vals = sorted(self._vals, reverse=not self._is_min_heap)
+        except TypeError:
+            return [self.pop() for _ in range(len(self._vals))]
+        self._vals = []
+        return vals
+
     def push(self, value):
         """Add a value into the heap."""
-        self._vals.append(value)
-        idx = len(self) - 1
-        up_heap(self, idx)
+        vals = self._vals
+        vals.append(value)
+        up_heap(vals, None, None, len(vals) - 1, self._is_min_heap)
 
     def poppush(self, value):
         """Pop from the heap then push value into the heap.
         More efficient then pop() followed by push().
         """
         top_val = self.peek()
-        self._vals[0] = value
-        down_heap(self, 0)
+        self._replace_top(value)
         return top_val
 
     def pushpop(self, value):
@@ -316,33 +481,466 @@ class Heap(Sequence):
         top_val = self.peek()
         if self._upper_eq(value, top_val):
             return value
-        self._vals[0] = value
-        down_heap(self, 0)
+        self._replace_top(value)
         return top_val
 
     def extend(self, iterable):
         """Add values to the heap from an iterable.
 
         Use the heapify algorithm to rebuild the heap, to achieve O(n)
-        performance for heap creation/merge.
+        performance for heap creation/merge with the compiled _cutil. The
+        pure python build sorts the values instead, O(n log n) but in C.
         """
         self._vals.extend(iterable)
-        len_half = len(self) // 2
-        for idx in reversed(xrange(len_half)):
-            down_heap(self, idx)
+        heapify(self._vals, None, None, self._is_min_heap)
+
+    def _replace_top(self, value):
+        """Replace the top value and restore the heap.
+
+        When merging sorted runs, the new value often still belongs on top.
+        It is checked against the children of the top first, and stored in
+        place in that case, instead of moving the hole down to a leaf and
+        sifting back up.
+        """
+        vals = self._vals
+        vals[0] = value
+        upper_eq = self._upper_eq
+        for i in range(1, min(D + 1, len(vals))):
+            if not upper_eq(value, vals[i]):
+                down_heap(vals, None, None, 0, self._is_min_heap)
+                return
+
+
+class LazyKeyHeap(MutableMapping):
+    """A heap of keys and values that skips stale entries instead of
+    updating them in place.
+
+    No key-to-index table is kept, so the sifts do no bookkeeping at all.
+    Setting the value of a key that is already in the heap adds a new entry,
+    and the old entry is dropped when it reaches the top (deleted keys are
+    handled the same way). push() only sets the value if it is upper than
+    the current one. This is the usual "lazy" Dijkstra queue, which is
+    generally faster than decrease-key in KeyHeap at the cost of extra heap
+    slots. Entries with equal values are ordered by insertion, so the keys
+    are never compared. The interface is the same as KeyHeap, except that
+    there is no from_iterable().
+
+    Usage:
+    >>> heap = LazyKeyHeap(max_heap=True)  # create empty max-heap
+    >>> heap = LazyKeyHeap()  # create empty min-heap
+    >>> heap.push('a', 5)  # insert key-value into the heap
+    True
+    >>> heap.push('a', 2)  # upper value for 'a', the old one becomes stale
+    True
+    >>> heap.push('a', 9)  # not upper than the current value, ignored
+    False
+    >>> heap['b'] = 3  # set the value regardless of the current one
+    >>> heap.pop()  # pop and return the current top key-value
+    ('a', 2)
+    >>> len(heap)  # number of keys, stale entries are not counted
+    1
+    """
+
+    __slots__ = ('_vals', '_key2entry', '_counter', '_is_min_heap',
+                 '_upper_eq')
+
+    def __init__(self, init_data=None, max_heap=False):
+        """Create a heap. Default it returns a min-heap. Use
+        'max_heap' keyword to get max-heap.
+
+        Args:
+            init_data - Optional, initiate the heap with input data. Must be
+                        a dict or an iterable that returns (key, value).
+            max_heap - True if being max-heap. Default to False.
+        """
+        # (value, count, key) entries, including stale ones. The unique
+        # count breaks ties between equal values.
+        self._vals = []
+        self._key2entry = {}  # key -> its current entry
+        self._counter = itertools.count()
+        self._is_min_heap = not max_heap
+        self._upper_eq = operator.ge if max_heap else operator.le
+        if init_data is not None:
+            self.update(init_data)
+
+    def __contains__(self, key):
+        """Check if container has key."""
+        return key in self._key2entry
+
+    def __iter__(self):
+        """Return a iterable of the keys."""
+        return iter(self._key2entry)
+
+    def __len__(self):
+        """Return number of keys in the container."""
+        return len(self._key2entry)
+
+    def __repr__(self):
+        """Representation of the container."""
+        repr_list = ['<{} {{'.format(type(self).__name__)]
+        for key, entry in self._key2entry.items():
+            repr_list.append('{}: {}, '.format(repr(key), repr(entry[0])))
+        if self:
+            repr_list[-1] = repr_list[-1][:-2]
+        repr_list.append('}>')
+        return ''.join(repr_list)
+
+    def __getitem__(self, key):
+        """Return value from key."""
+        entry = self._key2entry.get(key)
+        if entry is None:
+            raise KeyError("key not in container")
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        """Set value of the key. A new entry is added in any case, and the
+        previous entry of the key becomes stale.
+        """
+        key2entry = self._key2entry
+        entry = (value, next(self._counter), key)
+        key2entry[key] = entry
+        if len(self._vals) >= 2 * len(key2entry):
+            # Mostly stale entries, rebuild from the live ones
+            self._vals = list(key2entry.values())
+            self._heapify()
+        else:
+            self._push_entry(entry)
+
+    def __delitem__(self, key):
+        """Remove the key and its value from the container. Its entry
+        becomes stale.
+        """
+        if self._key2entry.pop(key, None) is None:
+            raise KeyError("key not in container")
+
+    def clear(self):
+        """Empty the container."""
+        self._vals = []
+        self._key2entry = {}
+
+    def copy(self):
+        """Return a shallow copy of the container."""
+        new = type(self).__new__(type(self))
+        new._vals = self._vals[:]
+        new._key2entry = self._key2entry.copy()
+        new._counter = itertools.count(next(self._counter))
+        new._is_min_heap = self._is_min_heap
+        new._upper_eq = self._upper_eq
+        return new
+
+    def push(self, key, value):
+        """Set value of the key, unless the key is already in the heap with
+        a value upper than or equal to `value`. Return True if the value is
+        set.
+        """
+        entry = self._key2entry.get(key)
+        if entry is not None and self._upper_eq(entry[0], value):
+            return False
+        self[key] = value
+        return True
+
+    def update(self, *args, **kwds):
+        """D.update([E, ]**F) -> None.  Update D from dict/iterable E and F.
+        If E present and has a .keys() method, does: for k in E: D[k] = E[k]
+        If E present and lacks .keys() method, does: for (k, v) in E: D[k] = v
+        In either case, this is followed by: for k in F: D[k] = F[k]
+
+        The heap is rebuilt from the live entries with the heapify
+        algorithm, to achieve O(n) performance for heap creation/merge.
+        """
+        key2val = {}
+        for i, container in enumerate(args):
+            try:
+                key2val.update(container)
+            except Exception:
+                raise TypeError(
+                    "cannot convert update sequence element "
+                    "#{} to a sequence".format(i))
+        key2val.update(kwds)
+        key2entry = self._key2entry
+        counter = self._counter
+        for key, value in key2val.items():
+            key2entry[key] = (value, next(counter), key)
+        self._vals = list(key2entry.values())
+        self._heapify()
+
+    def pop(self, key=None):
+        """Remove and return the given key and value.
+        If key is not given, pop top element of the heap
+        (min element in min-heap; max element in max-heap).
+        """
+        if key is not None:
+            return super().pop(key)
+        key, value = self.peek()
+        self._pop_entry()
+        del self._key2entry[key]
+        if not self._key2entry:
+            # Only stale entries can be left
+            self._vals = []
+        return key, value
+
+    def popitem(self):
+        """Remove and return the top element of the heap."""
+        return self.pop()
+
+    def peek(self):
+        """Return the top element of the heap
+        (min element in min-heap; max element in max-heap).
+        Stale entries found on top are dropped.
+        """
+        vals = self._vals
+        key2entry = self._key2entry
+        while vals:
+            entry = vals[0]
+            if key2entry.get(entry[2]) is entry:
+                return entry[2], entry[0]
+            self._pop_entry()
+        raise KeyError("peek/pop from an empty container")
+
+    def drain(self):
+        """Remove all the elements and return them as a list of (key, value)
+        in pop order. Stale entries are skipped without sorting them.
+        Values that can not be sorted (e.g. only define <=) are popped one
+        by one instead.
+        """
+        try:
+            entries = sorted(self._key2entry.values(),
+                             reverse=not self._is_min_heap)
+        except TypeError:
+            return [self.popitem() for _ in range(len(self))]
+        self.clear()
+        return [(key, value) for value, _, key in entries]
+
+    def _push_entry(self, entry):
+        """Add an entry into the heap."""
+        vals = self._vals
+        vals.append(entry)
+        up_heap(vals, None, None, len(vals) - 1, self._is_min_heap)
+
+    def _pop_entry(self):
+        """Remove the top entry of the heap."""
+        vals = self._vals
+        entry_last = vals.pop()
+        if vals:
+            vals[0] = entry_last
+            down_heap(vals, None, None, 0, self._is_min_heap)
+
+    def _heapify(self):
+        """Rebuild the heap after entries are appended."""
+        heapify(self._vals, None, None, self._is_min_heap)
+
+
+class HeapqKeyHeap(LazyKeyHeap):
+    """A LazyKeyHeap running on the standard heapq module.
+
+    The entries are pushed and popped with heapq, whose sifts are
+    implemented in C, so this is faster than LazyKeyHeap. It can replace a
+    min-heap KeyHeap, with the same interface except from_iterable(). heapq
+    only provides a binary min-heap, so max-heap is not supported.
+
+    Usage:
+    >>> heap = HeapqKeyHeap()  # create empty min-heap
+    >>> heap.push('a', 5)  # insert key-value into the heap
+    True
+    >>> heap.push('a', 2)  # upper value for 'a', the old one becomes stale
+    True
+    >>> heap.pop()  # pop and return the current top key-value
+    ('a', 2)
+    """
+
+    __slots__ = ()
+
+    def __init__(self, init_data=None):
+        """Create a min-heap.
+
+        Args:
+            init_data - Optional, initiate the heap with input data. Must be
+                        a dict or an iterable that returns (key, value).
+        """
+        super().__init__(init_data)
+
+    def _push_entry(self, entry):
+        """Add an entry into the heap."""
+        heapq.heappush(self._vals, entry)
+
+    def _pop_entry(self):
+        """Remove the top entry of the heap."""
+        heapq.heappop(self._vals)
+
+    def _heapify(self):
+        """Rebuild the heap after entries are appended."""
+        heapq.heapify(self._vals)
+
+
+class RadixKeyHeap(MutableMapping):
+    """A monotone min-heap of keys and non-negative integer values.
+
+    This is a radix heap: a key with value v is kept in bucket
+    (v ^ top).bit_length(), where top is the last popped value (0 when the
+    heap is empty). Popping refills bucket 0 from the lowest non-empty
+    bucket, and each key only moves to lower buckets, so an operation costs
+    O(log C) amortized for values up to C instead of O(log n). No value can
+    be set lower than the last popped one, which holds for the distances of
+    Dijkstra's algorithm with non-negative integer weights. peek() does not
+    move the top. The interface is the same as a min-heap KeyHeap, except
+    that there is no from_iterable().
+
+    Usage:
+    >>> heap = RadixKeyHeap()  # create empty min-heap
+    >>> heap['a'] = 5  # insert key-value into the heap
+    >>> heap.update((("b", 10), ("c", 3)))  # insert multiple key-values
+    >>> heap.pop()  # pop and return the current top element
+    ('c', 3)
+    >>> heap["b"] = 4  # Update the key value, not lower than 3
+    >>> heap.peek()  # Get the current top element
+    ('b', 4)
+    >>> heap.push("a", 7)  # Only set the value if it is lower
+    False
+    """
 
-    def _idx2val(self, idx):
-        """Return the value stored at position `idx` in heap."""
-        return self[idx]
+    __slots__ = ('_key2val', '_buckets', '_top')
 
-    def _upper_eq(self, i, j):
-        """Return True if i is upper than or equal to j.
-        For min-heap, upper=less; for max-heap upper=greater.
+    def __init__(self, init_data=None):
+        """Create a min-heap.
+
+        Args:
+            init_data - Optional, initiate the heap with input data. Must be
+                        a dict or an iterable that returns (key, value).
         """
-        if self._is_min_heap:
-            return i <= j
-        return i >= j
+        self._key2val = {}
+        self._buckets = [{}]  # key -> value, grown on demand
+        self._top = 0
+        if init_data is not None:
+            self.update(init_data)
+
+    def __contains__(self, key):
+        """Check if container has key."""
+        return key in self._key2val
+
+    def __iter__(self):
+        """Return a iterable of the keys."""
+        return iter(self._key2val)
+
+    def __len__(self):
+        """Return length of the container."""
+        return len(self._key2val)
+
+    def __repr__(self):
+        """Representation of the container."""
+        return '<RadixKeyHeap ' + repr(self._key2val) + '>'
 
-    def _swap(self, i1, i2):
-        """Swap the values in two indices."""
-        self._vals[i1], self._vals[i2] = self[i2], self[i1]
+    def __getitem__(self, key):
+        """Return value from key."""
+        return self._key2val[key]
+
+    def __setitem__(self, key, value):
+        """Set value of the key. If key does not in container, add the
+        key-value into container. Otherwise update the value of the key.
+        The value must be an integer not lower than the last popped value.
+        """
+        value = operator.index(value)
+        if value < self._top:
+            raise ValueError("value is lower than the last popped value")
+        key2val = self._key2val
+        buckets = self._buckets
+        if key in key2val:
+            del buckets[(key2val[key] ^ self._top).bit_length()][key]
+        idx = (value ^ self._top).bit_length()
+        while idx >= len(buckets):
+            buckets.append({})
+        buckets[idx][key] = value
+        key2val[key] = value
+
+    def __delitem__(self, key):
+        """Remove the key and its value from the container."""
+        value = self._key2val.pop(key)
+        del self._buckets[(value ^ self._top).bit_length()][key]
+        if not self._key2val:
+            self._top = 0
+
+    def clear(self):
+        """Empty the container."""
+        self._key2val = {}
+        self._buckets = [{}]
+        self._top = 0
+
+    def copy(self):
+        """Return a shallow copy of the container."""
+        new = type(self).__new__(type(self))
+        new._key2val = self._key2val.copy()
+        new._buckets = [bucket.copy() for bucket in self._buckets]
+        new._top = self._top
+        return new
+
+    def push(self, key, value):
+        """Set value of the key, unless the key is already in the heap with
+        a value lower than or equal to `value`. Return True if the value is
+        set.
+        """
+        val_old = self._key2val.get(key)
+        if val_old is not None and val_old <= value:
+            return False
+        self[key] = value
+        return True
+
+    def pop(self, key=None):
+        """Remove and return the given key and value.
+        If key is not given, pop top element of the heap.
+        """
+        if key is not None:
+            return super().pop(key)
+        return self.popitem()
+
+    def popitem(self):
+        """Remove and return the top element of the heap."""
+        self._refill()
+        key, value = self._buckets[0].popitem()
+        del self._key2val[key]
+        if not self._key2val:
+            # Any value can be set again, as in a new heap
+            self._top = 0
+        return key, value
+
+    def peek(self):
+        """Return the top element of the heap.
+
+        Unlike popitem(), the buckets and the top are left as they are, so
+        peeking does not change which values can be set.
+        """
+        # The item popitem() would remove: the last one with the minimum
+        # value, as _refill() moves them into bucket 0 in order
+        bucket = self._lowest_bucket()
+        top = min(bucket.values())
+        for key, value in reversed(bucket.items()):
+            if value == top:
+                return key, value
+
+    def drain(self):
+        """Remove all the elements and return them as a list of (key, value)
+        in pop order.
+        """
+        items = sorted(self._key2val.items(), key=operator.itemgetter(1))
+        self.clear()
+        return items
+
+    def _refill(self):
+        """Make bucket 0 hold the top values, by moving the top to the
+        minimum of the lowest non-empty bucket and redistributing it.
+        """
+        bucket = self._lowest_bucket()
+        if bucket is self._buckets[0]:
+            return
+        buckets = self._buckets
+        top = min(bucket.values())
+        self._top = top
+        # Every value of the bucket lands in a lower one
+        for key, value in bucket.items():
+            buckets[(value ^ top).bit_length()][key] = value
+        bucket.clear()
+
+    def _lowest_bucket(self):
+        """Return the lowest non-empty bucket."""
+        for bucket in self._buckets:
+            if bucket:
+                return bucket
+        raise KeyError("peek/pop from an empty container")
@@ -0,0 +1,142 @@
+# cython: language_level=3
+"""Compiled version of the sift routines in _numutil.py, over typed
+memoryviews of float64 or int64 values.
+
+The numeric heaps use this module when it is built, so they then only need
+numpy, and fall back to the Numba routines of _numutil.py otherwise. Build it
+in place with:
+    $ cythonize -i data_struct/binary_heap/_cnumutil.pyx
+"""
+cimport cython
+from libc.stdint cimport int64_t
+
+cdef enum:
+    D = 8  # Number of children per node, same as _numutil.D
+
+# The value types of _numeric.DTYPES
+ctypedef fused value_t:
+    double
+    int64_t
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void down_heap(value_t[::1] vals, Py_ssize_t size, Py_ssize_t idx):
+    """Perform down-heap operation on input index of the first `size`
+    elements of `vals`. See _numutil.down_heap().
+    """
+    cdef value_t val_curr = vals[idx]
+    cdef value_t val_child
+    cdef Py_ssize_t idx_child = D * idx + 1
+    cdef Py_ssize_t idx_last, i
+    while idx_child < size:
+        # Pick the smallest (first smallest on ties) of the up to D children
+        idx_last = min(idx_child + D, size)
+        val_child = vals[idx_child]
+        for i in range(idx_child + 1, idx_last):
+            if vals[i] < val_child:
+                idx_child = i
+                val_child = vals[i]
+        if val_curr <= val_child:
+            break
+        vals[idx] = val_child
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void up_heap(value_t[::1] vals, Py_ssize_t idx):
+    """Perform up-heap operation on input index. See _numutil.up_heap()."""
+    cdef value_t val_curr = vals[idx]
+    cdef value_t val_parent
+    cdef Py_ssize_t idx_parent
+    while idx > 0:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if val_parent <= val_curr:
+            break
+        vals[idx] = val_parent
+        idx = idx_parent
+    vals[idx] = val_curr
+
+
+cpdef void heapify(value_t[::1] vals, Py_ssize_t size):
+    """Rearrange the first `size` elements of `vals` into a heap."""
+    cdef Py_ssize_t idx
+    for idx in range((size - 2) // D, -1, -1):
+        down_heap(vals, size, idx)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void key_down_heap(value_t[::1] vals, int64_t[::1] pos2id,
+                         int64_t[::1] id2pos, Py_ssize_t size,
+                         Py_ssize_t idx):
+    """Perform down-heap operation on input index, moving the ids along.
+    See _numutil.key_down_heap().
+    """
+    cdef value_t val_curr = vals[idx]
+    cdef value_t val_child
+    cdef int64_t id_curr = pos2id[idx]
+    cdef int64_t id_child
+    cdef Py_ssize_t idx_child = D * idx + 1
+    cdef Py_ssize_t idx_last, i
+    while idx_child < size:
+        idx_last = min(idx_child + D, size)
+        val_child = vals[idx_child]
+        for i in range(idx_child + 1, idx_last):
+            if vals[i] < val_child:
+                idx_child = i
+                val_child = vals[i]
+        if val_curr <= val_child:
+            break
+        vals[idx] = val_child
+        id_child = pos2id[idx_child]
+        pos2id[idx] = id_child
+        id2pos[id_child] = idx
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+    pos2id[idx] = id_curr
+    id2pos[id_curr] = idx
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void key_up_heap(value_t[::1] vals, int64_t[::1] pos2id,
+                       int64_t[::1] id2pos, Py_ssize_t idx):
+    """Perform up-heap operation on input index, moving the ids along.
+    See _numutil.key_up_heap().
+    """
+    cdef value_t val_curr = vals[idx]
+    cdef value_t val_parent
+    cdef int64_t id_curr = pos2id[idx]
+    cdef int64_t id_parent
+    cdef Py_ssize_t idx_parent
+    while idx > 0:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if val_parent <= val_curr:
+            break
+        vals[idx] = val_parent
+        id_parent = pos2id[idx_parent]
+        pos2id[idx] = id_parent
+        id2pos[id_parent] = idx
+        idx = idx_parent
+    vals[idx] = val_curr
+    pos2id[idx] = id_curr
+    id2pos[id_curr] = idx
+
+
+cpdef void key_heapify(value_t[::1] vals, int64_t[::1] pos2id,
+                       int64_t[::1] id2pos, Py_ssize_t size):
+    """Rearrange the first `size` values and ids into a heap."""
+    cdef Py_ssize_t idx
+    for idx in range((size - 2) // D, -1, -1):
+        key_down_heap(vals, pos2id, id2pos, size, idx)
@@ -0,0 +1,92 @@
+# cython: language_level=3
+"""Compiled version of the sift routines in _util.py.
+
+The heap classes use this module when it is built, and fall back to the pure
+python _util.py otherwise. Build it in place with:
+    $ cythonize -i data_struct/binary_heap/_cutil.pyx
+"""
+cimport cython
+from cpython.object cimport PyObject_RichCompareBool, Py_LE, Py_GE
+
+cdef enum:
+    D = 4  # Number of children per node, same as _util.D
+
+
+cdef inline bint _upper_eq(object i, object j, int op) except -1:
+    """Return True if i is upper than or equal to j, where `op` is Py_LE for
+    min-heap and Py_GE for max-heap (picked once per call, not per compare).
+    """
+    return PyObject_RichCompareBool(i, j, op)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef void down_heap(list vals, list ids, list id2pos, Py_ssize_t idx,
+                     bint is_min) except *:
+    """Perform down-heap operation on input index. See _util.down_heap()."""
+    cdef bint keyed = ids is not None
+    cdef int op = Py_LE if is_min else Py_GE
+    cdef Py_ssize_t length = len(vals)
+    cdef Py_ssize_t idx_top = idx
+    cdef Py_ssize_t idx_child = D * idx + 1
+    cdef Py_ssize_t idx_last, i
+    cdef object val_curr = vals[idx]
+    cdef object id_curr = ids[idx] if keyed else None
+    cdef object val_child, id_
+    while idx_child < length:
+        # Pick the upper (first upper on ties) of the up to D children
+        idx_last = min(idx_child + D, length)
+        val_child = vals[idx_child]
+        for i in range(idx_child + 1, idx_last):
+            if not _upper_eq(val_child, vals[i], op):
+                idx_child = i
+                val_child = vals[i]
+        vals[idx] = val_child
+        if keyed:
+            id_ = ids[idx_child]
+            ids[idx] = id_
+            id2pos[id_] = idx
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+    if keyed:
+        ids[idx] = id_curr
+        id2pos[id_curr] = idx
+    up_heap(vals, ids, id2pos, idx, is_min, idx_top)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef void up_heap(list vals, list ids, list id2pos, Py_ssize_t idx,
+                   bint is_min, Py_ssize_t idx_top=0) except *:
+    """Perform up-heap operation on input index, stopping at `idx_top`.
+    See _util.up_heap().
+    """
+    cdef bint keyed = ids is not None
+    cdef int op = Py_LE if is_min else Py_GE
+    cdef Py_ssize_t idx_parent
+    cdef object val_curr = vals[idx]
+    cdef object id_curr = ids[idx] if keyed else None
+    cdef object val_parent, id_
+    while idx > idx_top:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if _upper_eq(val_parent, val_curr, op):
+            break
+        vals[idx] = val_parent
+        if keyed:
+            id_ = ids[idx_parent]
+            ids[idx] = id_
+            id2pos[id_] = idx
+        idx = idx_parent
+    vals[idx] = val_curr
+    if keyed:
+        ids[idx] = id_curr
+        id2pos[id_curr] = idx
+
+
+cpdef void heapify(list vals, list ids, list id2pos, bint is_min) except *:
+    """Rearrange the input lists into a heap in O(n). See _util.heapify()."""
+    cdef Py_ssize_t idx
+    for idx in range((len(vals) - 2) // D, -1, -1):
+        down_heap(vals, ids, id2pos, idx, is_min)
@@ -0,0 +1,462 @@
+import numpy as np
+import operator
+from collections.abc import MutableMapping, Sequence
+try:
+    from ._cnumutil import (down_heap, heapify, key_down_heap, key_heapify,
+                            key_up_heap, up_heap)
+except ImportError:
+    from ._numutil import (down_heap, heapify, key_down_heap, key_heapify,
+                           key_up_heap, up_heap)
+
+INIT_CAPACITY = 8
+DTYPES = (np.float64, np.int64)  # Value types supported by the kernels
+
+
+def _check_dtype(dtype):
+    """Return `dtype` as a NumPy dtype, if the heaps support it."""
+    dtype = np.dtype(dtype)
+    if dtype not in DTYPES:
+        raise ValueError("dtype must be float64 or int64")
+    return dtype
+
+
+def _check_int(value, dtype):
+    """Return `value`, as an int if `dtype` is int64. Raise ValueError for a
+    non-integral value there instead of letting NumPy truncate it.
+    """
+    if dtype != np.int64:
+        return value
+    try:
+        return operator.index(value)
+    except TypeError:
+        pass
+    try:
+        int_value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        int_value = None
+    if int_value is None or int_value != value:
+        raise ValueError("{!r} is not an integer".format(value))
+    return int_value
+
+
+def _fromiter(values, dtype, count=-1):
+    """Return an array of `values` as `dtype`, checked like _check_int()."""
+    if dtype != np.int64:
+        return np.fromiter(values, dtype=dtype, count=count)
+    values = list(values)
+    array = np.fromiter(values, dtype=dtype, count=count)
+    if (array != np.asarray(values)).any():
+        raise ValueError("values are not all integers")
+    return array
+
+
+def _grow(array, size, n_used):
+    """Return `array` if it holds `size` elements, otherwise a copy of its
+    first `n_used` elements in an array grown by doubling.
+    """
+    capacity = len(array)
+    if size <= capacity:
+        return array
+    while capacity < size:
+        capacity *= 2
+    new = np.empty(capacity, dtype=array.dtype)
+    new[:n_used] = array[:n_used]
+    return new
+
+
+class NumericHeap(Sequence):
+    """A heap of numbers backed by a NumPy array.
+
+    This is an 8-ary heap with the same interface as Heap. The values are
+    stored as float64 (or int64) in a NumPy array, and the sift routines are
+    compiled (_cnumutil with Cython if built, otherwise _numutil with Numba),
+    so no python object comparison is involved. Requires numpy, and numba
+    unless _cnumutil is built.
+
+    Usage:
+    >>> heap = NumericHeap(max_heap=True)  # create empty max-heap
+    >>> heap = NumericHeap()  # create empty min-heap
+    >>> heap.push(10)  # insert value into the heap
+    >>> heap.extend([0, 7]) # insert values from iterable
+    >>> heap.peek()  # Get the current top element
+    0.0
+    >>> heap.pop()  # pop and return the current top element
+    0.0
+    >>> heap.peek()  # Get the current top element
+    7.0
+    """
+
+    __slots__ = ('_vals', '_size', '_sign')
+
+    def __init__(self, init_data=None, max_heap=False, dtype=np.float64):
+        """Create a heap. Default it returns a min-heap. Use
+        'max_heap' keyword to get max-heap.
+
+        Args:
+            init_data - Optional input iterable of numbers to populate the
+                        heap.
+            max_heap - True if being max-heap. Default to False.
+            dtype - Type of the stored values, float64 (default) or int64.
+                    int64 suits integer weights, which are then returned as
+                    python ints.
+        """
+        self._vals = np.empty(INIT_CAPACITY, dtype=_check_dtype(dtype))
+        self._size = 0
+        self._sign = -1 if max_heap else 1
+        if init_data is not None:
+            self.extend(init_data)
+
+    def __contains__(self, value):
+        """Check if container has value. This is a linear scan, O(n)."""
+        return bool((self._vals[:self._size] == value * self._sign).any())
+
+    def __iter__(self):
+        """Return a iterable of the values."""
+        return iter((self._vals[:self._size] * self._sign).tolist())
+
+    def __len__(self):
+        """Return length of the container."""
+        return self._size
+
+    def __repr__(self):
+        """Representation of the container."""
+        return '<NumericHeap ' + repr(list(self)) + '>'
+
+    def __getitem__(self, index):
+        """Return value from index."""
+        if index >= self._size:
+            raise IndexError("index out of range")
+        return self._vals[:self._size][index].item() * self._sign
+
+    def clear(self):
+        """Empty the container."""
+        self._size = 0
+
+    def copy(self):
+        """Return a copy."""
+        new = type(self).__new__(type(self))
+        new._vals = self._vals.copy()
+        new._size = self._size
+        new._sign = self._sign
+        return new
+
+    def pop(self):
+        """Remove and return the top element of the heap
+        (min element in min-heap; max element in max-heap).
+        """
+        top_val = self.peek()
+        self._size -= 1
+        if self._size:
+            self._vals[0] = self._vals[self._size]
+            down_heap(self._vals, self._size, 0)
+        return top_val
+
+    def peek(self):
+        """Return the top element of the heap
+        (min element in min-heap; max element in max-heap).
+        """
+        if not self._size:
+            raise IndexError("peek/pop from an empty container")
+        return self._vals[0].item() * self._sign
+
+    def drain(self):
+        """Remove all the elements and return them as a list in pop order,
+        sorted at once with NumPy.
+        """
+        vals = np.sort(self._vals[:self._size]) * self._sign
+        self.clear()
+        return vals.tolist()
+
+    def push(self, value):
+        """Add a value into the heap."""
+        value = _check_int(value, self._vals.dtype)
+        self._reserve(self._size + 1)
+        self._vals[self._size] = value * self._sign
+        self._size += 1
+        up_heap(self._vals, self._size - 1)
+
+    def poppush(self, value):
+        """Pop from the heap then push value into the heap.
+        More efficient then pop() followed by push().
+        """
+        top_val = self.peek()
+        value = _check_int(value, self._vals.dtype)
+        self._vals[0] = value * self._sign
+        down_heap(self._vals, self._size, 0)
+        return top_val
+
+    def pushpop(self, value):
+        """Push value into the heap then pop from the heap.
+        More efficient then push() followed by pop().
+        """
+        top_val = self.peek()
+        value = _check_int(value, self._vals.dtype)
+        if value * self._sign <= self._vals[0]:
+            # As stored, so the type returned only depends on the dtype
+            return self._vals.dtype.type(value).item()
+        self._vals[0] = value * self._sign
+        down_heap(self._vals, self._size, 0)
+        return top_val
+
+    def extend(self, iterable):
+        """Add values to the heap from an iterable.
+
+        Use the heapify algorithm to rebuild the heap, to achieve O(n)
+        performance for heap creation/merge.
+        """
+        new_vals = _fromiter(iterable, self._vals.dtype)
+        size = self._size + len(new_vals)
+        self._reserve(size)
+        self._vals[self._size:size] = new_vals * self._sign
+        self._size = size
+        heapify(self._vals, self._size)
+
+    def _reserve(self, size):
+        """Grow the array by doubling until it holds `size` values."""
+        self._vals = _grow(self._vals, size, self._size)
+
+
+class NumericKeyHeap(MutableMapping):
+    """A heap of keys and numbers backed by NumPy arrays.
+
+    This is an 8-ary heap with the same interface as KeyHeap. Each key is
+    given a small integer id, and the heap itself only moves float64 (or
+    int64) values and int64 ids in NumPy arrays, with compiled sift routines.
+    The keys are only touched through the key-to-id dict. Same requirements
+    as NumericHeap.
+
+    Usage:
+    >>> heap = NumericKeyHeap(max_heap=True)  # create empty max-heap
+    >>> heap = NumericKeyHeap()  # create empty min-heap
+    >>> heap['a'] = 1  # insert key-value into the heap
+    >>> heap.update((("b", 10), ("c", 3)))  # insert multiple key-values
+    >>> heap.pop()  # pop and return the current top element
+    ('a', 1.0)
+    >>> heap["b"] = 2  # Update the key value (cause heap reorganization)
+    >>> heap.peek()  # Get the current top element
+    ('b', 2.0)
+    """
+
+    __slots__ = ('_vals', '_pos2id', '_id2pos', '_key2id', '_id2key',
+                 '_free_ids', '_size', '_sign')
+
+    def __init__(self, init_data=None, max_heap=False, dtype=np.float64):
+        """Create a heap. Default it returns a min-heap. Use
+        'max_heap' keyword to get max-heap.
+
+        Args:
+            init_data - Optional, initiate the heap with input data. Must be
+                        a dict or an iterable that returns (key, value).
+            max_heap - True if being max-heap. Default to False.
+            dtype - Type of the stored values, float64 (default) or int64.
+                    int64 suits integer weights, which are then returned as
+                    python ints.
+        """
+        self._vals = np.empty(0, dtype=_check_dtype(dtype))
+        self._sign = -1 if max_heap else 1
+        self.clear()
+        if init_data is not None:
+            self.update(init_data)
+
+    def __contains__(self, key):
+        """Check if container has key."""
+        return key in self._key2id
+
+    def __iter__(self):
+        """Return a iterable of the keys."""
+        return iter(self._key2id)
+
+    def __len__(self):
+        """Return length of the container."""
+        return self._size
+
+    def __repr__(self):
+        """Representation of the container."""
+        repr_list = ['<NumericKeyHeap {']
+        for key, val in self._key2val().items():
+            repr_list.append('{}: {}, '.format(repr(key), val))
+        if self:
+            repr_list[-1] = repr_list[-1][:-2]
+        repr_list.append('}>')
+        return ''.join(repr_list)
+
+    def __getitem__(self, key):
+        """Return value from key."""
+        id_ = self._key2id.get(key, -1)
+        if id_ < 0:
+            raise KeyError("key not in container")
+        return self._vals[self._id2pos[id_]].item() * self._sign
+
+    def __setitem__(self, key, value):
+        """Set value of the key. If key does not in container, add the
+        key-value into container. Otherwise update the value of the key.
+        """
+        value = _check_int(value, self._vals.dtype)
+        id_ = self._key2id.get(key, -1)
+        if id_ < 0:
+            if self._free_ids:
+                # Reuse the id of a removed key, so the id arrays only grow
+                # with the largest number of keys held at once
+                id_ = self._free_ids.pop()
+                self._id2key[id_] = key
+            else:
+                id_ = len(self._id2key)
+                self._id2key.append(key)
+                self._id2pos = _grow(self._id2pos, id_ + 1, id_)
+            self._key2id[key] = id_
+            size = self._size
+            self._vals = _grow(self._vals, size + 1, size)
+            self._pos2id = _grow(self._pos2id, size + 1, size)
+            self._vals[size] = value * self._sign
+            self._pos2id[size] = id_
+            self._id2pos[id_] = size
+            self._size = size + 1
+            key_up_heap(self._vals, self._pos2id, self._id2pos, size)
+        else:
+            idx = self._id2pos[id_]
+            val_old = self._vals[idx]
+            self._vals[idx] = value * self._sign
+            if self._vals[idx] <= val_old:
+                key_up_heap(self._vals, self._pos2id, self._id2pos, idx)
+            else:
+                key_down_heap(self._vals, self._pos2id, self._id2pos,
+                              self._size, idx)
+
+    def __delitem__(self, key):
+        """Remove the key and its value from the container."""
+        id_ = self._key2id.pop(key, -1)
+        if id_ < 0:
+            raise KeyError("key not in container")
+        self._remove(id_)
+
+    def clear(self):
+        """Empty the container."""
+        self._vals = np.empty(INIT_CAPACITY, dtype=self._vals.dtype)
+        self._pos2id = np.empty(INIT_CAPACITY, dtype=np.int64)
+        self._id2pos = np.empty(INIT_CAPACITY, dtype=np.int64)
+        self._key2id = {}
+        self._id2key = []
+        self._free_ids = []
+        self._size = 0
+
+    def copy(self):
+        """Return a copy of the container."""
+        new = type(self).__new__(type(self))
+        new._vals = self._vals.copy()
+        new._pos2id = self._pos2id.copy()
+        new._id2pos = self._id2pos.copy()
+        new._key2id = self._key2id.copy()
+        new._id2key = self._id2key[:]
+        new._free_ids = self._free_ids[:]
+        new._size = self._size
+        new._sign = self._sign
+        return new
+
+    def update(self, *args, **kwds):
+        """D.update([E, ]**F) -> None.  Update D from dict/iterable E and F.
+        If E present and has a .keys() method, does: for k in E: D[k] = E[k]
+        If E present and lacks .keys() method, does: for (k, v) in E: D[k] = v
+        In either case, this is followed by: for k in F: D[k] = F[k]
+
+        The heap is rebuilt with the heapify algorithm, to achieve O(n)
+        performance for heap creation/merge.
+        """
+        key2val = self._key2val()
+        for i, container in enumerate(args):
+            try:
+                key2val.update(container)
+            except Exception:
+                raise TypeError(
+                    "cannot convert update sequence element "
+                    "#{} to a sequence".format(i))
+        key2val.update(kwds)
+        size = len(key2val)
+        capacity = max(INIT_CAPACITY, size)
+        dtype = self._vals.dtype
+        vals = _fromiter(key2val.values(), dtype, count=size)
+        self._vals = np.empty(capacity, dtype=dtype)
+        self._vals[:size] = vals * self._sign
+        self._pos2id = np.arange(capacity, dtype=np.int64)
+        self._id2pos = np.arange(capacity, dtype=np.int64)
+        self._id2key = list(key2val)
+        self._key2id = dict(zip(self._id2key, range(size)))
+        self._free_ids = []
+        self._size = size
+        key_heapify(self._vals, self._pos2id, self._id2pos, size)
+
+    def push(self, key, value):
+        """Set value of the key, unless the key is already in the heap with
+        a value upper than or equal to `value`. Return True if the value is
+        set.
+        """
+        value = _check_int(value, self._vals.dtype)
+        id_ = self._key2id.get(key, -1)
+        if id_ >= 0 and self._vals[self._id2pos[id_]] <= value * self._sign:
+            return False
+        self[key] = value
+        return True
+
+    def pop(self, key=None):
+        """Remove and return the given key and value.
+        If key is not given, pop top element of the heap
+        (min element in min-heap; max element in max-heap).
+        """
+        if key is not None:
+            return super().pop(key)
+        return self.popitem()
+
+    def popitem(self):
+        """Remove and return the top element of the heap."""
+        key, value = self.peek()
+        del self._key2id[key]
+        self._remove(int(self._pos2id[0]))
+        return key, value
+
+    def peek(self):
+        """Return the top element of the heap
+        (min element in min-heap; max element in max-heap).
+        """
+        if not self._size:
+            raise KeyError("peek/pop from an empty container")
+        return (self._id2key[self._pos2id[0]],
+                self._vals[0].item() * self._sign)
+
+    def drain(self):
+        """Remove all the elements and return them as a list of (key, value)
+        in pop order, sorted at once with NumPy.
+        """
+        order = np.argsort(self._vals[:self._size], kind='stable')
+        id2key = self._id2key
+        keys = [id2key[id_] for id_ in self._pos2id[order].tolist()]
+        vals = (self._vals[order] * self._sign).tolist()
+        self.clear()
+        return list(zip(keys, vals))
+
+    def _key2val(self):
+        """Return a dict of the key-values in heap order, read from the
+        arrays in bulk instead of looking up the keys one by one.
+        """
+        id2key = self._id2key
+        size = self._size
+        keys = [id2key[id_] for id_ in self._pos2id[:size].tolist()]
+        return dict(zip(keys, (self._vals[:size] * self._sign).tolist()))
+
+    def _remove(self, id_):
+        """Remove the value of an id, whose key is already dropped from
+        _key2id.
+        """
+        self._id2key[id_] = None
+        self._free_ids.append(id_)
+        idx = self._id2pos[id_]
+        size = self._size - 1
+        self._size = size
+        if idx < size:
+            # Move the last element in, it may belong above or below idx
+            vals = self._vals
+            pos2id = self._pos2id
+            id2pos = self._id2pos
+            vals[idx] = vals[size]
+            pos2id[idx] = pos2id[size]
+            id2pos[pos2id[idx]] = idx
+            key_down_heap(vals, pos2id, id2pos, size, idx)
+            key_up_heap(vals, pos2id, id2pos, idx)
@@ -0,0 +1,111 @@
+"""Sift routines of the numeric heaps, compiled with Numba.
+
+The routines only build min-heaps over float64 or int64 values (and int64
+ids). A max-heap stores its values multiplied by -1, so the compiled loops
+have no min/max branch. _cnumutil.pyx is the Cython version of this module.
+"""
+from numba import njit
+
+# Number of children per node. Eight float64 children fill one 64-byte cache
+# line, so a sift touches about one line per level, with a third of the
+# levels of a binary heap.
+D = 8
+
+
+@njit(cache=True)
+def down_heap(vals, size, idx):
+    """Perform down-heap operation on input index of the first `size`
+    elements of `vals`.
+    """
+    val_curr = vals[idx]
+    idx_child = D * idx + 1
+    while idx_child < size:
+        # Pick the smallest (first smallest on ties) of the up to D children
+        idx_last = min(idx_child + D, size)
+        val_child = vals[idx_child]
+        for i in range(idx_child + 1, idx_last):
+            if vals[i] < val_child:
+                idx_child = i
+                val_child = vals[i]
+        if val_curr <= val_child:
+            break
+        vals[idx] = val_child
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+
+
+@njit(cache=True)
+def up_heap(vals, idx):
+    """Perform up-heap operation on input index."""
+    val_curr = vals[idx]
+    while idx > 0:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if val_parent <= val_curr:
+            break
+        vals[idx] = val_parent
+        idx = idx_parent
+    vals[idx] = val_curr
+
+
+@njit(cache=True)
+def heapify(vals, size):
+    """Rearrange the first `size` elements of `vals` into a heap."""
+    for idx in range((size - 2) // D, -1, -1):
+        down_heap(vals, size, idx)
+
+
+@njit(cache=True)
+def key_down_heap(vals, pos2id, id2pos, size, idx):
+    """Perform down-heap operation on input index, moving the ids in
+    `pos2id` along with the values and keeping `id2pos` in sync.
+    """
+    val_curr = vals[idx]
+    id_curr = pos2id[idx]
+    idx_child = D * idx + 1
+    while idx_child < size:
+        idx_last = min(idx_child + D, size)
+        val_child = vals[idx_child]
+        for i in range(idx_child + 1, idx_last):
+            if vals[i] < val_child:
+                idx_child = i
+                val_child = vals[i]
+        if val_curr <= val_child:
+            break
+        vals[idx] = val_child
+        id_child = pos2id[idx_child]
+        pos2id[idx] = id_child
+        id2pos[id_child] = idx
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+    pos2id[idx] = id_curr
+    id2pos[id_curr] = idx
+
+
+@njit(cache=True)
+def key_up_heap(vals, pos2id, id2pos, idx):
+    """Perform up-heap operation on input index, moving the ids along."""
+    val_curr = vals[idx]
+    id_curr = pos2id[idx]
+    while idx > 0:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if val_parent <= val_curr:
+            break
+        vals[idx] = val_parent
+        id_parent = pos2id[idx_parent]
+        pos2id[idx] = id_parent
+        id2pos[id_parent] = idx
+        idx = idx_parent
+    vals[idx] = val_curr
+    pos2id[idx] = id_curr
+    id2pos[id_curr] = idx
+
+
+@njit(cache=True)
+def key_heapify(vals, pos2id, id2pos, size):
+    """Rearrange the first `size` values and ids into a heap."""
+    for idx in range((size - 2) // D, -1, -1):
+        key_down_heap(vals, pos2id, id2pos, size, idx)
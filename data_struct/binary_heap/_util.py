@@ -1,49 +1,108 @@
-def _get_parent(heap, idx):
-    """Get the parent index-value of the input index."""
-    idx_parent = (idx - 1) // 2
-    val_parent = heap._idx2val(idx_parent) if idx != 0 else None
-    return idx_parent, val_parent
-
-
-def _get_children(heap, idx):
-    """Get the children index-value of the input index."""
-    length = len(heap)
-    idx_left = 2 * idx + 1
-    val_left = heap._idx2val(idx_left) if idx_left < length else None
-    idx_right = idx_left + 1
-    val_right = heap._idx2val(idx_right) if idx_right < length else None
-    return idx_left, val_left, idx_right, val_right
-
-
-def down_heap(heap, idx):
-    """Perform down-heap operation on input index."""
-    idx_curr = idx
-    val_curr = heap._idx2val(idx)
-    while True:
-        idx_left, val_left, idx_right, val_right = (
-            _get_children(heap, idx_curr))
-        if val_left is None:
-            break
-        elif val_right is None or heap._upper_eq(val_left, val_right):
-            child_idx_upper = idx_left
-            child_val_upper = val_left
+# Number of children per node. A 4-ary heap is half as deep as a binary heap
+# and keeps siblings next to each other in the backing list.
+D = 4
+
+
+def down_heap(vals, ids, id2pos, idx, is_min):
+    """Perform down-heap operation on input index.
+
+    The hole at `idx` is first moved down to a leaf along the upper
+    children, without comparing against the sifted element, which then sifts
+    up from the leaf. Since the element usually belongs near the bottom, this
+    saves about one comparison per level (same approach as CPython heapq).
+
+    Args:
+        vals - The list storing the heap values.
+        ids - The list of integer key ids parallel to `vals`, moved along
+              with the values. None for a heap of plain values.
+        id2pos - List mapping the ids to their index, kept in sync while
+                 sifting. None for a heap of plain values.
+        idx - Index of the element to sift down.
+        is_min - True for min-heap, False for max-heap.
+    """
+    keyed = ids is not None
+    length = len(vals)
+    idx_top = idx
+    val_curr = vals[idx]
+    if keyed:
+        id_curr = ids[idx]
+    idx_child = D * idx + 1
+    while idx_child < length:
+        # Pick the upper (first upper on ties) of the up to D children,
+        # without building a slice of them
+        idx_last = idx_child + D
+        if idx_last > length:
+            idx_last = length
+        val_child = vals[idx_child]
+        # Only <= / >= are used, as in up_heap() and _cutil, with the loop
+        # picked once per level instead of testing is_min per compare
+        if is_min:
+            for i in range(idx_child + 1, idx_last):
+                val = vals[i]
+                if not val_child <= val:
+                    idx_child = i
+                    val_child = val
         else:
-            child_idx_upper = idx_right
-            child_val_upper = val_right
+            for i in range(idx_child + 1, idx_last):
+                val = vals[i]
+                if not val_child >= val:
+                    idx_child = i
+                    val_child = val
+        vals[idx] = val_child
+        if keyed:
+            id_ = ids[idx_child]
+            ids[idx] = id_
+            id2pos[id_] = idx
+        idx = idx_child
+        idx_child = D * idx + 1
+    vals[idx] = val_curr
+    if keyed:
+        ids[idx] = id_curr
+        id2pos[id_curr] = idx
+    up_heap(vals, ids, id2pos, idx, is_min, idx_top)
 
-        if heap._upper_eq(val_curr, child_val_upper):
-            break
-        heap._swap(idx_curr, child_idx_upper)
-        idx_curr = child_idx_upper
 
+def up_heap(vals, ids, id2pos, idx, is_min, idx_top=0):
+    """Perform up-heap operation on input index, stopping at `idx_top`.
 
-def up_heap(heap, idx):
-    """Perform up-heap operation on input index."""
-    idx_curr = idx
-    val_curr = heap._idx2val(idx)
-    while True:
-        idx_parent, val_parent = _get_parent(heap, idx_curr)
-        if val_parent is None or heap._upper_eq(val_parent, val_curr):
+    Args are the same as down_heap().
+    """
+    keyed = ids is not None
+    val_curr = vals[idx]
+    if keyed:
+        id_curr = ids[idx]
+    while idx > idx_top:
+        idx_parent = (idx - 1) // D
+        val_parent = vals[idx_parent]
+        if val_parent <= val_curr if is_min else val_parent >= val_curr:
             break
-        heap._swap(idx_curr, idx_parent)
-        idx_curr = idx_parent
+        vals[idx] = val_parent
+        if keyed:
+            id_ = ids[idx_parent]
+            ids[idx] = id_
+            id2pos[id_] = idx
+        idx = idx_parent
+    vals[idx] = val_curr
+    if keyed:
+        ids[idx] = id_curr
+        id2pos[id_curr] = idx
+
+
+def heapify(vals, ids, id2pos, is_min):
+    """Rearrange the input lists into a heap.
+
+    Args are the same as down_heap().
+    """
+    if ids is None:
+        # A sorted list is a heap of any arity. The sort is O(n log n) but
+        # runs in C, and beats sifting every node down in python (heapq can
+        # not be used, it only builds binary heaps). With ids, reordering
+        # the parallel lists costs more than the sort saves. The sort needs
+        # <, so values that only define <= are sifted down below instead.
+        try:
+            vals.sort(reverse=not is_min)
+            return
+        except TypeError:
+            pass
+    for idx in reversed(range((len(vals) - 2) // D + 1)):
+        down_heap(vals, ids, id2pos, idx, is_min)
@@ -1,15 +1,51 @@
-from binary_heap import KeyHeap, Heap
+import functools
+import os
+import random
+import subprocess
+import sys
+from unittest import SkipTest
+from binary_heap._util import D
+from binary_heap import (KeyHeap, Heap, LazyKeyHeap, HeapqKeyHeap,
+                         RadixKeyHeap)
+try:
+    from binary_heap import NumericHeap, NumericKeyHeap
+    from binary_heap._numutil import D as NUM_D
+except ImportError:
+    NumericHeap = NumericKeyHeap = None
 
 num_list = [3, 10, -2]
 keyval_list = [('c', 3), ('a', 10), ('b', -2)]
 keyval_dict = {'a': 10, 'b': -2, 'c': 3}
 
 
+def needs_numeric(test):
+    """Skip the test if the numeric heaps can not be imported."""
+    @functools.wraps(test)
+    def wrapper():
+        if NumericHeap is None:
+            raise SkipTest("numpy/numba not installed")
+        test()
+    return wrapper
+
+
 def pop_heap(heap):
     while heap:
         yield heap.pop()
 
 
+class LeOnly:
+    """A value that only supports <=, which is all the heaps compare with."""
+
+    def __init__(self, val):
+        self.val = val
+
+    def __le__(self, other):
+        return self.val <= other.val
+
+    def __ge__(self, other):
+        return self.val >= other.val
+
+
 # --- Heap Tests ---
 def test_pop_heap():
     heap1 = Heap(num_list)
@@ -44,6 +80,25 @@ def test_push_pop():
     assert(heap.poppush(-10) == 3)
 
 
+def test_merge_heap():
+    runs = [sorted(random.Random(i).sample(range(100), 20)) for i in range(6)]
+    heap = Heap((run[0], i, 0) for i, run in enumerate(runs))
+    merged = []
+    while heap:
+        val, i, j = heap.peek()
+        merged.append(val)
+        if j + 1 < len(runs[i]):
+            heap.poppush((runs[i][j + 1], i, j + 1))
+        else:
+            heap.pop()
+    assert(merged == sorted(sum(runs, [])))
+
+
+def test_from_iterable_heap():
+    heap = Heap.from_iterable(iter(num_list), max_heap=True)
+    assert([10, 3, -2] == [i for i in pop_heap(heap)])
+
+
 def test_copy_heap():
     heap = Heap(num_list)
     copy = heap.copy()
@@ -59,6 +114,150 @@ def test_clear_heap():
     assert(not heap)
 
 
+def test_drain():
+    heaps = [Heap(num_list * 2), Heap(num_list, max_heap=True),
+             KeyHeap(keyval_list), KeyHeap(keyval_list, max_heap=True),
+             LazyKeyHeap(keyval_list), HeapqKeyHeap(keyval_list),
+             RadixKeyHeap({'a': 10, 'b': 2, 'c': 3})]
+    if NumericHeap is not None:
+        heaps += [NumericHeap(num_list, max_heap=True),
+                  NumericKeyHeap(keyval_list)]
+    for heap in heaps:
+        items = heap.drain()
+        assert(not heap)
+        if hasattr(heap, 'extend'):
+            heap.extend(items)
+        else:
+            heap.update(items)
+        assert(items == [i for i in pop_heap(heap)])
+
+
+# --- NumericHeap Tests ---
+def test_numeric_heap_lazy_import():
+    # numpy is only loaded when a numeric heap is first used
+    code = ("import sys, binary_heap; "
+            "assert 'numpy' not in sys.modules; "
+            "binary_heap.Heap([1]).pop()")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.check_call([sys.executable, '-c', code], cwd=root)
+
+
+@needs_numeric
+def test_pop_numeric_heap():
+    heap1 = NumericHeap(num_list)
+    heap2 = NumericHeap()
+    for i in num_list * 5:
+        heap2.push(i)
+
+    assert([-2, 3, 10] == [i for i in pop_heap(heap1)])
+    assert(sorted(num_list * 5) == [i for i in pop_heap(heap2)])
+
+
+@needs_numeric
+def test_random_numeric_heap():
+    rng = random.Random(0)
+    vals = [rng.random() for _ in range(1000)]
+    heap1 = NumericHeap(vals)
+    heap2 = NumericHeap(max_heap=True)
+    for i in vals:
+        heap2.push(i)
+    assert(sorted(vals) == [i for i in pop_heap(heap1)])
+    assert(sorted(vals, reverse=True) == [i for i in pop_heap(heap2)])
+
+
+@needs_numeric
+def test_int_numeric_heap():
+    big = 2 ** 60 + 1  # not exact as float64
+    heap1 = NumericHeap(num_list + [big], dtype='int64')
+    heap2 = NumericKeyHeap(keyval_list, max_heap=True, dtype='int64')
+    heap2['d'] = big
+    assert([-2, 3, 10, big] == [i for i in pop_heap(heap1)])
+    assert([('d', big), ('a', 10), ('c', 3), ('b', -2)] ==
+           [i for i in pop_heap(heap2)])
+    try:
+        NumericHeap(dtype='int32')
+        assert(False)
+    except ValueError:
+        pass
+
+
+@needs_numeric
+def test_int_numeric_heap_non_integral():
+    heap1 = NumericHeap([2.0], dtype='int64')
+    heap2 = NumericKeyHeap({'a': 3}, dtype='int64')
+    for func, args in ((heap1.push, (2.7,)), (heap1.extend, ([1, 0.5],)),
+                       (heap1.pushpop, (-0.5,)), (heap1.poppush, (0.5,)),
+                       (heap2.__setitem__, ('b', 0.5)),
+                       (heap2.push, ('a', 2.5)),
+                       (heap2.update, ({'b': 1.5},))):
+        try:
+            func(*args)
+            assert(False)
+        except ValueError:
+            pass
+    assert([2] == list(heap1))
+    assert({'a': 3} == dict(heap2))
+
+
+@needs_numeric
+def test_max_numeric_heap():
+    heap = NumericHeap(num_list, max_heap=True)
+    assert(type(heap.pushpop(11)) is float)
+    assert(heap.pushpop(0) == 10)
+    assert(heap.poppush(-5) == 3)
+    assert([0, -2, -5] == [i for i in pop_heap(heap)])
+
+
+@needs_numeric
+def test_copy_numeric_heap():
+    heap = NumericHeap(num_list)
+    copy = heap.copy()
+    copy.clear()
+    assert(len(heap) == 3 and len(copy) == 0)
+    assert(3 in heap and 3 not in copy)
+
+
+@needs_numeric
+def test_pop_numeric_keyheap():
+    heap1 = NumericKeyHeap(keyval_list)
+    heap2 = NumericKeyHeap(max_heap=True)
+    heap2.update(keyval_dict)
+    assert([('b', -2), ('c', 3), ('a', 10)] == [i for i in pop_heap(heap1)])
+    assert([('a', 10), ('c', 3), ('b', -2)] == [i for i in pop_heap(heap2)])
+    heap1['d'] = 1  # Reuses a popped id, which must stay a python int
+    assert(type(heap1._key2id['d']) is int)
+
+
+@needs_numeric
+def test_numeric_keyheap_invariant():
+    rng = random.Random(0)
+    for max_heap in (False, True):
+        heap = NumericKeyHeap(max_heap=max_heap)
+        ref = {}
+        for _ in range(500):
+            key = rng.randrange(60)
+            if rng.random() < 0.7:
+                heap[key] = ref[key] = rng.randrange(100)
+            elif key in heap:
+                del heap[key]
+                del ref[key]
+            if ref:
+                top = max(ref.values()) if max_heap else min(ref.values())
+                assert(heap.peek()[1] == top)
+            # Values are stored negated in a max-heap, so always a min-heap
+            vals = heap._vals
+            for idx in range(1, len(heap)):
+                assert(vals[(idx - 1) // NUM_D] <= vals[idx])
+            for idx in range(len(heap)):
+                id_ = heap._pos2id[idx]
+                assert(heap._id2pos[id_] == idx)
+                assert(heap._key2id[heap._id2key[id_]] == id_)
+            assert(dict(heap) == ref)
+        assert(len(heap._id2key) <= 60)
+        vals = sorted(ref.values(), reverse=max_heap)
+        assert(vals == [val for key, val in pop_heap(heap)])
+
+
 # --- KeyHeap Tests ---
 def test_pop_keyheap():
     heap1 = KeyHeap(keyval_list)
@@ -95,17 +294,267 @@ def test_key_update():
     assert(heap.peek() == ('a', -9))
 
 
+def test_popitem_keyheap():
+    heaps = [KeyHeap(keyval_list), KeyHeap(keyval_list, max_heap=True)]
+    if NumericKeyHeap is not None:
+        heaps.append(NumericKeyHeap(keyval_list))
+    for heap in heaps:
+        top = heap.peek()
+        assert(heap.popitem() == top)
+        assert(len(heap) == 2)
+    try:
+        KeyHeap().popitem()
+        assert(False)
+    except KeyError:
+        pass
+
+
+def test_push_keyheap():
+    heaps = [KeyHeap(keyval_list), LazyKeyHeap(keyval_list)]
+    if NumericKeyHeap is not None:
+        heaps.append(NumericKeyHeap(keyval_list))
+    for heap in heaps:
+        assert(not heap.push('c', 5))
+        assert(not heap.push('c', 3))
+        assert(heap.push('a', -5))
+        assert(heap.push('d', 0))
+        assert([('a', -5), ('b', -2), ('d', 0), ('c', 3)] ==
+               [i for i in pop_heap(heap)])
+
+
+def test_update_keyheap():
+    heap = KeyHeap(keyval_list)
+    heap.update({'a': -9, 'd': 0}, c=-1)
+    expected = [('a', -9), ('b', -2), ('c', -1), ('d', 0)]
+    assert(expected == [i for i in pop_heap(heap)])
+
+
+def test_from_iterable_keyheap():
+    heap = KeyHeap.from_iterable(keyval_list + [('b', 20)])
+    assert(heap['b'] == 20)
+    assert([('c', 3), ('a', 10), ('b', 20)] == [i for i in pop_heap(heap)])
+    heap = KeyHeap.from_iterable(keyval_dict, max_heap=True)
+    assert([('a', 10), ('c', 3), ('b', -2)] == [i for i in pop_heap(heap)])
+
+
+def test_del_keyheap():
+    heap = KeyHeap((i, (i * 7) % 13) for i in range(13))
+    del heap[12]
+    del heap[5]
+    del heap[0]
+    assert(5 not in heap)
+    assert(heap.get(5) is None)
+    expected = sorted((i * 7) % 13 for i in range(1, 12) if i != 5)
+    assert(expected == [val for key, val in pop_heap(heap)])
+
+
+def test_keyheap_invariant():
+    rng = random.Random(0)
+    for max_heap in (False, True):
+        heap = KeyHeap(max_heap=max_heap)
+        for _ in range(500):
+            key = rng.randrange(60)
+            if rng.random() < 0.7:
+                heap[key] = rng.randrange(100)
+            elif key in heap:
+                del heap[key]
+            for idx in range(1, len(heap)):
+                parent = heap._vals[(idx - 1) // D]
+                assert(heap._upper_eq(parent, heap._vals[idx]))
+            for idx, id_ in enumerate(heap._ids):
+                assert(heap._id2pos[id_] == idx)
+                assert(heap._key2id[heap._id2key[id_]] == id_)
+        assert(len(heap._id2key) <= 60)
+        vals = sorted(heap.values(), reverse=max_heap)
+        assert(vals == [val for key, val in pop_heap(heap)])
+
+
+def test_le_only_keyheap():
+    vals = random.Random(0).sample(range(100), 30)
+    for max_heap in (False, True):
+        heap1 = KeyHeap(max_heap=max_heap)
+        heap2 = Heap(max_heap=max_heap)
+        for i, val in enumerate(vals):
+            heap1[i] = LeOnly(val)
+            heap2.push(LeOnly(val))
+        heap3 = Heap(map(LeOnly, vals[:10]), max_heap=max_heap)
+        heap3.extend(map(LeOnly, vals[10:]))
+        expected = sorted(vals, reverse=max_heap)
+        assert(expected == [val.val for key, val in pop_heap(heap1)])
+        assert(expected == [val.val for val in pop_heap(heap2)])
+        assert(expected == [val.val for val in pop_heap(heap3)])
+
+        # drain() can not sort the values, so it pops them
+        heap1.update((i, LeOnly(val)) for i, val in enumerate(vals))
+        heap2.extend(map(LeOnly, vals))
+        heap3 = LazyKeyHeap(((i, LeOnly(val)) for i, val in enumerate(vals)),
+                            max_heap=max_heap)
+        assert(expected == [val.val for key, val in heap1.drain()])
+        assert(expected == [val.val for val in heap2.drain()])
+        assert(expected == [val.val for key, val in heap3.drain()])
+        assert(not heap1 and not heap2 and not heap3)
+
+    heap = Heap(map(LeOnly, [5, 1, 3, 2, 4, 6]))
+    assert(heap.poppush(LeOnly(7)).val == 1)
+    assert(heap.pushpop(LeOnly(0)).val == 0)
+    assert(heap.pushpop(LeOnly(9)).val == 2)
+    assert([3, 4, 5, 6, 7, 9] == [val.val for val in pop_heap(heap)])
+
+
 def test_copy_keyheap():
     heap = KeyHeap(keyval_list)
     copy = heap.copy()
-    assert(heap._val_keys == copy._val_keys)
-    assert(heap._key2idx == copy._key2idx)
+    assert(heap._vals == copy._vals)
+    assert(heap._ids == copy._ids)
+    assert(heap._key2id == copy._key2id)
     assert(heap is not copy)
 
 
+def test_copy_subclass():
+    class MyKeyHeap(KeyHeap):
+        __slots__ = ()
+
+    cases = [(MyKeyHeap, keyval_list), (Heap, num_list),
+             (LazyKeyHeap, keyval_list), (HeapqKeyHeap, keyval_list),
+             (RadixKeyHeap, {'a': 10, 'b': 2, 'c': 3})]
+    if NumericHeap is not None:
+        cases += [(NumericHeap, num_list), (NumericKeyHeap, keyval_list)]
+    for cls, data in cases:
+        heap = cls(data)
+        copy = heap.copy()
+        assert(type(copy) is cls)
+        assert(list(pop_heap(heap)) == list(pop_heap(copy)))
+
+
 def test_clear_keyheap():
     heap = KeyHeap(keyval_list)
     assert(len(heap) == 3)
     heap.clear()
     assert(len(heap) == 0)
     assert(not heap)
+
+
+def test_keyheap_slots():
+    heaps = [KeyHeap(), Heap(), LazyKeyHeap(), HeapqKeyHeap(), RadixKeyHeap()]
+    if NumericHeap is not None:
+        heaps += [NumericHeap(), NumericKeyHeap()]
+    for heap in heaps:
+        assert(not hasattr(heap, '__dict__'))
+
+
+# --- LazyKeyHeap Tests ---
+def test_pop_lazy_keyheap():
+    heap = LazyKeyHeap(keyval_list)
+    heap.push('a', -5)
+    heap.push('b', 7)
+    heap.push('d', 0)
+    assert(len(heap) == 4)
+    expected = [('a', -5), ('b', -2), ('d', 0), ('c', 3)]
+    assert(expected == [i for i in pop_heap(heap)])
+    assert(len(heap) == 0 and not heap._vals)
+
+
+def test_max_lazy_keyheap():
+    heap = LazyKeyHeap(keyval_dict, max_heap=True)
+    heap.push('b', 20)
+    heap.push('a', 0)
+    assert(heap.peek() == ('b', 20))
+    assert('b' in heap and 'x' not in heap)
+    expected = [('b', 20), ('a', 10), ('c', 3)]
+    assert(expected == [i for i in pop_heap(heap)])
+
+
+def test_lazy_keyheap_ties():
+    # Keys with equal values are not compared
+    for heap in (LazyKeyHeap(), HeapqKeyHeap()):
+        heap.push(1, 0)
+        heap.push('a', 0)
+        heap.push(None, 0)
+        assert([1, 'a', None] == [key for key, val in pop_heap(heap)])
+
+
+def test_lazy_keyheap_mapping():
+    for heap in (LazyKeyHeap(keyval_list), HeapqKeyHeap(keyval_list)):
+        heap['b'] = 20
+        heap['d'] = 5
+        del heap['c']
+        assert(heap['b'] == 20 and 'c' not in heap)
+        assert(heap.pop('d') == 5)
+        for i in range(10):
+            heap['a'] = i
+        assert(len(heap._vals) <= 4)
+        assert([('a', 9), ('b', 20)] == [i for i in pop_heap(heap)])
+
+
+# --- HeapqKeyHeap Tests ---
+def test_pop_heapq_keyheap():
+    heap = HeapqKeyHeap(keyval_list)
+    heap.push('a', -5)
+    heap.push('b', 7)
+    heap.push('d', 0)
+    copy = heap.copy()
+    expected = [('a', -5), ('b', -2), ('d', 0), ('c', 3)]
+    assert(expected == [i for i in pop_heap(heap)])
+    assert(expected == [i for i in pop_heap(copy)])
+
+
+# --- RadixKeyHeap Tests ---
+def test_pop_radix_keyheap():
+    heap = RadixKeyHeap({'a': 10, 'b': 2, 'c': 3, 'd': 2})
+    assert(heap.peek() == heap.pop())
+    assert([('b', 2), ('c', 3)] == [heap.pop(), heap.pop()])
+    try:
+        heap['d'] = 2
+        assert(False)
+    except ValueError:
+        pass
+    assert(heap.pop() == ('a', 10))
+    heap['d'] = 1  # An emptied heap takes any value again
+    assert(heap.pop() == ('d', 1))
+
+
+def test_peek_radix_keyheap():
+    heap = RadixKeyHeap({'a': 5})
+    assert(heap.peek() == ('a', 5))
+    heap['b'] = 3  # peek() does not move the top
+    assert(heap.peek() == heap.pop() == ('b', 3))
+
+    rng = random.Random(0)
+    heap = RadixKeyHeap((i, rng.randrange(50)) for i in range(100))
+    while heap:
+        top = heap.peek()
+        assert(top == heap.pop())
+        for _ in range(rng.randrange(2)):
+            heap[rng.randrange(200)] = top[1] + rng.randrange(20)
+
+
+def test_push_radix_keyheap():
+    heap = RadixKeyHeap({'a': 5})
+    assert(not heap.push('a', 5))
+    assert(not heap.push('a', 6))
+    assert(heap.push('a', 4))
+    assert(heap.push('b', 9))
+    assert([('a', 4), ('b', 9)] == [i for i in pop_heap(heap)])
+
+
+def test_radix_keyheap_dijkstra():
+    rng = random.Random(0)
+    n = 200
+    edges = [(rng.randrange(n), rng.randrange(n), rng.randrange(1000))
+             for _ in range(2000)]
+    graph = [[] for _ in range(n)]
+    for u, v, w in edges:
+        graph[u].append((v, w))
+
+    def dijkstra(heap):
+        dist = {}
+        heap[0] = 0
+        while heap:
+            u, d = heap.pop()
+            dist[u] = d
+            for v, w in graph[u]:
+                if v not in dist and (v not in heap or d + w < heap[v]):
+                    heap[v] = d + w
+        return dist
+
+    assert(dijkstra(RadixKeyHeap()) == dijkstra(KeyHeap()))
@@ -6,7 +6,7 @@ letter_data = ['a', 'b', 'c']
 def test_init():
     uf = UnionFind(3)
     uf.add(('a', 1))
-    for i in xrange(3):
+    for i in range(3):
         assert(i in uf)
     assert(('a', 1) in uf)
 
@@ -21,6 +21,32 @@ def test_init():
         assert(i in uf)
 
 
+def test_int_mode():
+    uf = UnionFind(3)
+    uf.add(3)
+    uf.union(0, 3)
+    assert(uf.n_subset == 3)
+    assert(list(uf) == [0, 1, 2, 3])
+    assert(-1 not in uf and 4 not in uf)
+
+    uf.add('a')
+    uf.union('a', 1)
+    assert(uf.is_same_subset(0, 3))
+    assert(uf.is_same_subset('a', 1))
+    assert(uf.n_subset == 3)
+    assert(len(uf) == 5)
+
+
+def test_int_mode_equal_value():
+    uf = UnionFind(3)
+    uf.union(0, 1)
+    assert(1.0 in uf and 1.5 not in uf and 'a' not in uf)
+    assert(uf.find(1.0) == uf.find(0))
+    uf.add(1.0)
+    assert(uf.n_subset == 2)
+    assert(len(uf) == 3)
+
+
 def test_union_find():
     uf = UnionFind(5)
     assert(uf.find(0) != uf.find(1))
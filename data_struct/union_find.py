@@ -1,11 +1,12 @@
+import operator
 from collections import defaultdict
 DEFAULT_ROOT = 0
 
 
-class UnionFind(object):
+class UnionFind:
     """A union find data structure.
 
-    The data structure is implemented with union-by-rank and path compression
+    The data structure is implemented with union-by-rank and path halving
     to achieve almost constant runtime. The interface is similar to a Python
     set. All values in the container must be unique.
 
@@ -22,24 +23,28 @@ class UnionFind(object):
     9
 
     """
+    __slots__ = ('_val2root', '_val2rank', '_n_subset', '_int_mode')
+
     def __init__(self, init_data=None):
         """Create the UnionFind with init_data.
 
         Args:
             init_data - Can be a iterable for the elements to be added. Or an
                         integer, which adds range(init_data) into container.
+                        The elements are then stored in lists indexed by
+                        value instead of dicts, until a value that does not
+                        extend the range is added.
         """
-
-        if init_data is None:
+        self._int_mode = isinstance(init_data, int)
+        if self._int_mode:
+            self._val2root = list(range(init_data))
+            self._val2rank = [0] * init_data
+        elif init_data is None:
             self._val2root = {}
             self._val2rank = {}
-            self._n_subset = 0
-            return
-
-        if isinstance(init_data, int):
-            init_data = xrange(init_data)
-        self._val2root = {i: i for i in init_data}
-        self._val2rank = {i: 0 for i in init_data}
+        else:
+            self._val2root = {i: i for i in init_data}
+            self._val2rank = dict.fromkeys(self._val2root, 0)
         self._n_subset = len(self)
 
     def __len__(self):
@@ -48,10 +53,14 @@ class UnionFind(object):
 
     def __iter__(self):
         """Return iterator of the container."""
+        if self._int_mode:
+            return iter(range(len(self._val2root)))
         return iter(self._val2root)
 
     def __contains__(self, value):
         """Check if value is in the container."""
+        if self._int_mode:
+            return self._int_index(value) is not None
         return value in self._val2root
 
     def __repr__(self):
@@ -70,16 +79,25 @@ class UnionFind(object):
 
     def clear(self):
         """Remove all elements."""
-        self._val2root.clear()
-        self._val2rank.clear()
+        if self._int_mode:
+            self._val2root = []
+            self._val2rank = []
+        else:
+            self._val2root.clear()
+            self._val2rank.clear()
         self._n_subset = 0
 
     def copy(self):
         """Return a shallow copy."""
-        new = UnionFind()
-        new._val2root = self._val2root.copy()
-        new._val2rank = self._val2rank.copy()
+        new = type(self).__new__(type(self))
+        if self._int_mode:
+            new._val2root = self._val2root[:]
+            new._val2rank = self._val2rank[:]
+        else:
+            new._val2root = self._val2root.copy()
+            new._val2rank = self._val2rank.copy()
         new._n_subset = self._n_subset
+        new._int_mode = self._int_mode
         return new
 
     def add(self, value):
@@ -87,30 +105,44 @@ class UnionFind(object):
         already in container."""
         if value in self:
             return
+        if self._int_mode:
+            if value == len(self._val2root) and isinstance(value, int):
+                self._val2root.append(value)
+                self._val2rank.append(0)
+                self._n_subset += 1
+                return
+            self._use_dicts()
+            if value in self._val2root:
+                return
         self._val2root[value] = value
         self._val2rank[value] = 0
         self._n_subset += 1
 
     def find(self, value):
         """Find the subset where the input value belongs to."""
-        if value not in self:
+        if self._int_mode:
+            # Look up equal non-int values (1.0, numpy ints) by list index
+            value = self._int_index(value)
+            if value is None:
+                raise KeyError("value not in container")
+        elif value not in self._val2root:
             raise KeyError("value not in container")
         if self._n_subset == 1:
             # All in one set
             return DEFAULT_ROOT
 
-        visited_keys = []
+        # Path halving: link each visited node to its grandparent while
+        # walking up, which needs no second pass over the path
+        val2root = self._val2root
         while True:
-            root = self._val2root[value]
-            if root == value:
-                break
-            visited_keys.append(value)
-            value = root
-
-        # Path compression
-        for key in visited_keys:
-            self._val2root[key] = root
-        return root
+            parent = val2root[value]
+            if parent == value:
+                return value
+            grandparent = val2root[parent]
+            if grandparent == parent:
+                return parent
+            val2root[value] = grandparent
+            value = grandparent
 
     def union(self, value1, value2):
         """Join the subsets where the two input values belong to."""
@@ -136,10 +168,39 @@ class UnionFind(object):
         """Check if two values are in the same subset."""
         return self.find(value1) == self.find(value2)
 
+    def _int_index(self, value):
+        """Return the list index of the element equal to value in int mode,
+        or None if there is none, matching the dict lookup of other modes."""
+        try:
+            idx = operator.index(value)
+        except TypeError:
+            try:
+                idx = int(value)
+            except (TypeError, ValueError, OverflowError):
+                return None
+            if idx != value:
+                return None
+        if 0 <= idx < len(self._val2root):
+            return idx
+        return None
+
+    def _use_dicts(self):
+        """Move the elements from lists to dicts, so that values other than
+        the next integer can be added."""
+        self._val2root = dict(enumerate(self._val2root))
+        self._val2rank = dict(enumerate(self._val2rank))
+        self._int_mode = False
+
     def get_subsets(self):
         """Return the current subsets as a list of sets."""
-        root2sets = defaultdict(set)
+        if self._n_subset == 1:
+            return [set(self)]
+        val2root = self._val2root
+        root2vals = defaultdict(list)
         for val in self:
             root = self.find(val)
-            root2sets[root].add(val)
-        return [subset for subset in root2sets.itervalues()]
+            # Link straight to the root, so finds through this value later
+            # in the loop stop after one step
+            val2root[val] = root
+            root2vals[root].append(val)
+        return [set(vals) for vals in root2vals.values()]